@@ -1,73 +1,255 @@
+import time
+import uuid
 import httpx
 import logging
-from typing import List
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from tenacity import AsyncRetrying, retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from .config import HOSTS
+from .diagnostics import Diagnostics, RequestTrace
 from .exceptions import GroupOperationException, RequestErrorException
+from .timeouts import TimeoutPolicy, stop_before_deadline
 
 logger = logging.getLogger(__name__)
 
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+
+# Errors raised after the request may have reached the host; connect and pool errors mean it was never sent
+AMBIGUOUS_REQUEST_ERRORS = (httpx.ReadTimeout, httpx.WriteTimeout, httpx.ReadError, httpx.WriteError,
+                            httpx.RemoteProtocolError)
+
+
+class HostResult(Enum):
+    """
+    Outcome of a create or delete request on a single host.
+
+    `ACKNOWLEDGED` means the host echoed the request's idempotency key, so the outcome does not
+    need to be verified. `DUPLICATE` means a retried create got a 409 after an attempt that may have
+    reached the host; the group exists but may predate the operation, so it must not be rolled back.
+    Only `FAILED` is falsy.
+    """
+
+    FAILED = 'failed'
+    SUCCEEDED = 'succeeded'
+    ACKNOWLEDGED = 'acknowledged'
+    DUPLICATE = 'duplicate'
+
+    def __bool__(self) -> bool:
+        return self is not HostResult.FAILED
+
 
 class ClusterClient:
-    def __init__(self, hosts: List[str] = HOSTS):
+    def __init__(self,
+                 hosts: List[str] = HOSTS,
+                 timeout_policy: Optional[TimeoutPolicy] = None,
+                 operation_timeout: Optional[float] = None,
+                 diagnostics: Optional[Diagnostics] = None):
         self.hosts = hosts
+        self.timeout_policy = timeout_policy or TimeoutPolicy()
+        self.operation_timeout = operation_timeout
+        self.diagnostics = diagnostics
 
-    @retry(
-        retry=retry_if_exception_type(RequestErrorException),
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10)
-    )
-    async def _create_group_on_host(self, client: httpx.AsyncClient, host: str, group_id: str) -> bool:
+    def _deadline(self) -> Optional[float]:
         """
-        Create a group on a specific host.
+        Compute the deadline for a top-level operation starting now.
+
+        :return: A `time.monotonic()` timestamp, or `None` if no operation timeout is configured.
+        """
+
+        if self.operation_timeout is None:
+            return None
+        return time.monotonic() + self.operation_timeout
+
+    async def _send(self, send: Callable[..., Awaitable[httpx.Response]], host: str,
+                    deadline: Optional[float], **kwargs: Any) -> httpx.Response:
+        """
+        Send a request to a host with the timeout policy and diagnostics applied.
+
+        :param send: The `httpx.AsyncClient` method used to send the request.
+        :param host: The host URL the request is sent to.
+        :param deadline: Optional `time.monotonic()` timestamp bounding the request timeouts.
+        :param kwargs: Arguments passed on to `send`.
+        :return: The received response.
+        """
+
+        kwargs['timeout'] = self.timeout_policy.timeout_for(host, deadline)
+
+        # The trace marks when a pool connection is acquired, so host latency excludes pool queueing
+        trace = self.diagnostics.trace(host) if self.diagnostics is not None else RequestTrace(None, host)
+        kwargs['extensions'] = {'trace': trace}
+
+        start = time.monotonic()
+        failed = True
+        try:
+            response = await send(**kwargs)
+            failed = False
+        except httpx.PoolTimeout:
+            # Waiting for a pool connection measures local contention, not the host
+            raise
+        except httpx.TimeoutException:
+            # A timed out request took at least this long on the wire, so record it as a censored sample
+            wire_time = trace.wire_time()
+            if wire_time is not None:
+                self.timeout_policy.record(host, wire_time)
+            raise
+        finally:
+            trace.finish(failed)
+
+        # Transports without a connection pool emit no trace events
+        wire_time = trace.wire_time()
+        self.timeout_policy.record(host, wire_time if wire_time is not None else time.monotonic() - start)
+
+        return response
+
+    @staticmethod
+    def _idempotency_headers(idempotency_key: Optional[str]) -> Dict[str, str]:
+        """
+        Build the request headers carrying an idempotency key.
+
+        :param idempotency_key: The idempotency key, if any.
+        :return: The headers to send with the request.
+        """
+
+        if idempotency_key is None:
+            return {}
+        return {IDEMPOTENCY_KEY_HEADER: idempotency_key}
+
+    @staticmethod
+    def _is_acknowledged(response: httpx.Response, idempotency_key: Optional[str]) -> bool:
+        """
+        Check whether a host acknowledged an idempotent request by echoing its idempotency key.
+
+        :param response: The response received from the host.
+        :param idempotency_key: The idempotency key sent with the request, if any.
+        :return: `True` if the response carries the same idempotency key; `False` otherwise.
+        """
+
+        return idempotency_key is not None and response.headers.get(IDEMPOTENCY_KEY_HEADER) == idempotency_key
+
+    def _success(self, response: httpx.Response, idempotency_key: Optional[str]) -> HostResult:
+        """
+        Classify a successful response by whether the host acknowledged the idempotency key.
+
+        :param response: The response received from the host.
+        :param idempotency_key: The idempotency key sent with the request, if any.
+        :return: `HostResult.ACKNOWLEDGED` if the key was echoed; `HostResult.SUCCEEDED` otherwise.
+        """
+
+        if self._is_acknowledged(response, idempotency_key):
+            return HostResult.ACKNOWLEDGED
+        return HostResult.SUCCEEDED
+
+    async def _create_group_on_host(self, client: httpx.AsyncClient, host: str, group_id: str,
+                                    deadline: Optional[float] = None,
+                                    idempotency_key: Optional[str] = None) -> HostResult:
+        """
+        Create a group on a specific host, retrying on request errors.
+
+        :param client: An instance of `httpx.AsyncClient` for making HTTP requests.
+        :param host: The host URL where the group is to be created.
+        :param group_id: The ID of the group to create.
+        :param deadline: Optional `time.monotonic()` timestamp bounding the request timeouts.
+        :param idempotency_key: Optional key sent in the `Idempotency-Key` header, stable across retries.
+        :return: `HostResult.FAILED` if the group could not be created or already existed before this
+            operation; `HostResult.SUCCEEDED`, `HostResult.ACKNOWLEDGED` or `HostResult.DUPLICATE` otherwise.
+        """
+
+        previous_error: Optional[httpx.RequestError] = None
+
+        async for attempt in AsyncRetrying(
+            retry=retry_if_exception_type(RequestErrorException),
+            stop=stop_after_attempt(3) | stop_before_deadline(deadline),
+            wait=wait_exponential(multiplier=1, min=1, max=10)
+        ):
+            with attempt:
+                try:
+                    return await self._post_group_on_host(client, host, group_id, deadline, idempotency_key,
+                                                          previous_error)
+                except RequestErrorException as exc:
+                    # Keep an error that may have reached the host, later attempts cannot undo it
+                    if not isinstance(previous_error, AMBIGUOUS_REQUEST_ERRORS):
+                        previous_error = exc.__cause__
+                    raise
+
+    async def _post_group_on_host(self, client: httpx.AsyncClient, host: str, group_id: str,
+                                  deadline: Optional[float], idempotency_key: Optional[str],
+                                  previous_error: Optional[httpx.RequestError]) -> HostResult:
+        """
+        Send a single group creation request to a specific host.
 
         :param client: An instance of `httpx.AsyncClient` for making HTTP requests.
         :param host: The host URL where the group is to be created.
         :param group_id: The ID of the group to create.
-        :return: `True` if the group is successfully created; `False` otherwise.
+        :param deadline: Optional `time.monotonic()` timestamp bounding the request timeouts.
+        :param idempotency_key: Optional key sent in the `Idempotency-Key` header.
+        :param previous_error: The request error of an earlier attempt of this operation, if any.
+        :return: The `HostResult` of the request.
+        :raises RequestErrorException: If the request fails with an `httpx.RequestError`.
         """
 
         url = f'{host}/v1/group/'
 
         try:
-            response = await client.post(url, json={'groupId': group_id}, timeout=10)
+            response = await self._send(client.post, host, deadline, url=url, json={'groupId': group_id},
+                                        headers=self._idempotency_headers(idempotency_key))
             if response.status_code == 201:
                 logger.info(f'Group {group_id} created on {host}')
-                return True
+                return self._success(response, idempotency_key)
+            elif response.status_code == 409:
+                if self._is_acknowledged(response, idempotency_key):
+                    logger.info(f'Group {group_id} already created on {host} by an earlier attempt')
+                    return HostResult.ACKNOWLEDGED
+                elif isinstance(previous_error, AMBIGUOUS_REQUEST_ERRORS):
+                    # The earlier attempt may have created the group, but it may also have existed before
+                    logger.warning(f'Group {group_id} exists on {host} after an ambiguous earlier attempt')
+                    return HostResult.DUPLICATE
+
+                logger.error(f'Group {group_id} already exists on {host}')
+                return HostResult.FAILED
 
             logger.error(f'Failed to create group on {host}: {response.status_code}')
-            return False
+            return HostResult.FAILED
 
         except httpx.RequestError as exc:
             logger.error(f'Request error occurred while creating group on {host}: {exc}')
-            raise RequestErrorException(host, str(exc))
+            raise RequestErrorException(host, str(exc)) from exc
 
     @retry(
         retry=retry_if_exception_type(RequestErrorException),
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(3) | stop_before_deadline(),
         wait=wait_exponential(multiplier=1, min=1, max=10)
     )
-    async def _delete_group_on_host(self, client: httpx.AsyncClient, host: str, group_id: str) -> bool:
+    async def _delete_group_on_host(self, client: httpx.AsyncClient, host: str, group_id: str,
+                                    deadline: Optional[float] = None,
+                                    idempotency_key: Optional[str] = None) -> HostResult:
         """
         Delete a group from a specific host.
 
         :param client: An instance of `httpx.AsyncClient` for making HTTP requests.
         :param host: The host URL where the group is to be deleted.
         :param group_id: The ID of the group to delete.
-        :return: `True` if the group is successfully deleted; `False` otherwise.
+        :param deadline: Optional `time.monotonic()` timestamp bounding the request timeouts.
+        :param idempotency_key: Optional key sent in the `Idempotency-Key` header, stable across retries.
+        :return: `HostResult.FAILED` if the group could not be deleted; `HostResult.SUCCEEDED` or
+            `HostResult.ACKNOWLEDGED` if it is deleted or does not exist.
         """
 
         url = f'{host}/v1/group/'
 
         try:
-            response = await client.request(method='DELETE', url=url, json={'groupId': group_id}, timeout=10)
+            response = await self._send(client.request, host, deadline, method='DELETE', url=url,
+                                        json={'groupId': group_id},
+                                        headers=self._idempotency_headers(idempotency_key))
             if response.status_code == 200:
                 logger.info(f'Group {group_id} deleted from {host}')
-                return True
+                return self._success(response, idempotency_key)
+            elif response.status_code == 404:
+                logger.info(f'Group {group_id} already absent from {host}')
+                return self._success(response, idempotency_key)
 
             logger.error(f'Failed to delete group on {host}: {response.status_code}')
-            return False
+            return HostResult.FAILED
 
         except httpx.RequestError as exc:
             logger.error(f'Request error occurred while deleting group on {host}: {exc}')
@@ -75,23 +257,25 @@ class ClusterClient:
 
     @retry(
         retry=retry_if_exception_type(RequestErrorException),
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(3) | stop_before_deadline(),
         wait=wait_exponential(multiplier=1, min=1, max=10)
     )
-    async def _verify_group_on_host(self, client: httpx.AsyncClient, host: str, group_id: str) -> bool:
+    async def _verify_group_on_host(self, client: httpx.AsyncClient, host: str, group_id: str,
+                                    deadline: Optional[float] = None) -> bool:
         """
         Verify that a group exists on a specific host.
 
         :param client: An instance of `httpx.AsyncClient` for making HTTP requests.
         :param host: The host URL where the group is expected to be verified.
         :param group_id: The ID of the group to verify.
+        :param deadline: Optional `time.monotonic()` timestamp bounding the request timeouts.
         :return: `True` if the group exists on the host; `False` otherwise.
         """
 
         url = f'{host}/v1/group/{group_id}/'
 
         try:
-            response = await client.get(url, timeout=10)
+            response = await self._send(client.get, host, deadline, url=url)
             if response.status_code == 200:
                 logger.info(f'Group {group_id} verified on {host}')
                 return True
@@ -120,13 +304,15 @@ class ClusterClient:
         logger.info('Rolling back creation on successful hosts...')
 
         undeleted_hosts = []
+        idempotency_key = str(uuid.uuid4())
 
         for host in success_hosts:
             try:
-                if not await self._delete_group_on_host(client, host, group_id):
+                result = await self._delete_group_on_host(client, host, group_id, idempotency_key=idempotency_key)
+                if not result:
                     logger.error(f'Failed to rollback creation on {host}')
                     undeleted_hosts.append(host)
-                else:
+                elif result is not HostResult.ACKNOWLEDGED:
                     # Verify deletion
                     if await self._verify_group_on_host(client, host, group_id):
                         logger.error(f'Group {group_id} still exists on {host} after rollback attempt')
@@ -150,17 +336,26 @@ class ClusterClient:
         :return: `True` if the group is successfully created and verified on all hosts; `False` otherwise.
         """
 
+        deadline = self._deadline()
+        idempotency_key = str(uuid.uuid4())
+
         async with httpx.AsyncClient() as client:
             success_hosts: List[str] = []
+            unverified_hosts: List[str] = []
             try:
                 for host in self.hosts:
-                    if not await self._create_group_on_host(client, host, group_id):
+                    result = await self._create_group_on_host(client, host, group_id, deadline, idempotency_key)
+                    if not result:
                         raise GroupOperationException(f'Failed to create group on {host}, initiating rollback.')
-                    success_hosts.append(host)
-
-                # Verify creation
-                for host in success_hosts:
-                    if not await self._verify_group_on_host(client, host, group_id):
+                    # A duplicate group may have existed before this operation, so it is never rolled back
+                    if result is not HostResult.DUPLICATE:
+                        success_hosts.append(host)
+                    if result is not HostResult.ACKNOWLEDGED and result is not HostResult.DUPLICATE:
+                        unverified_hosts.append(host)
+
+                # Verify creation on hosts that did not acknowledge the idempotency key or report a duplicate
+                for host in unverified_hosts:
+                    if not await self._verify_group_on_host(client, host, group_id, deadline):
                         raise GroupOperationException(f'Failed to verify group on {host}, initiating rollback.')
 
             except Exception as exc:
@@ -184,11 +379,13 @@ class ClusterClient:
         """
 
         undeleted_hosts = self.hosts[:]
+        deadline = self._deadline()
+        idempotency_key = str(uuid.uuid4())
 
         async with httpx.AsyncClient() as client:
             for host in self.hosts:
                 try:
-                    if not await self._delete_group_on_host(client, host, group_id):
+                    if not await self._delete_group_on_host(client, host, group_id, deadline, idempotency_key):
                         logger.warning(f'Deletion failed on host {host}')
                         continue
                     undeleted_hosts.remove(host)
@@ -24,3 +24,24 @@ def get_hosts():
 
 
 HOSTS = get_hosts()
+
+
+def get_timeout(name, default):
+    value = os.getenv(name, '')
+    if not value:
+        return default
+
+    try:
+        return float(value)
+    except ValueError:
+        logging.warning(f'{name} environment variable is not a number. Using default value {default}.')
+        return default
+
+
+CONNECT_TIMEOUT = get_timeout('CONNECT_TIMEOUT', 10.0)
+READ_TIMEOUT = get_timeout('READ_TIMEOUT', 10.0)
+WRITE_TIMEOUT = get_timeout('WRITE_TIMEOUT', 10.0)
+POOL_TIMEOUT = get_timeout('POOL_TIMEOUT', 10.0)
+
+
+DIAGNOSTICS = os.getenv('DIAGNOSTICS', '').strip().lower() in ('1', 'true', 'yes')
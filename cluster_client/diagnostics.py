@@ -0,0 +1,254 @@
+import io
+import time
+import signal
+import asyncio
+import logging
+import cProfile
+import pstats
+import tracemalloc
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTrace:
+    """
+    httpx trace extension splitting a request into queue time and network time.
+
+    Queue time lasts until httpcore emits its first event for the request, which happens once
+    a pool connection has been acquired. Everything after that (connect, TLS, send, receive)
+    counts as network time. Without `diagnostics` the trace only measures the network time.
+    """
+
+    def __init__(self, diagnostics: Optional['Diagnostics'], host: str):
+        self._diagnostics = diagnostics
+        self._host = host
+        self._started = time.perf_counter()
+        self._on_wire: Optional[float] = None
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]) -> None:
+        if self._on_wire is None:
+            self._on_wire = time.perf_counter()
+
+    def wire_time(self) -> Optional[float]:
+        """
+        Return the time elapsed since a pool connection was acquired for the request.
+
+        :return: The network time in seconds, or `None` if httpcore has not emitted any event yet.
+        """
+
+        if self._on_wire is None:
+            return None
+        return time.perf_counter() - self._on_wire
+
+    def finish(self, failed: bool = False) -> None:
+        """
+        Record the request timings once the request has completed or failed.
+
+        :param failed: Whether the request raised instead of returning a response.
+        """
+
+        if self._diagnostics is None:
+            return
+
+        finished = time.perf_counter()
+        on_wire = self._on_wire if self._on_wire is not None else self._started
+        self._diagnostics.record_request(self._host, on_wire - self._started, finished - on_wire, failed)
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """
+    Collect the slow callback warnings asyncio logs in debug mode.
+    """
+
+    def __init__(self, diagnostics: 'Diagnostics'):
+        super().__init__(level=logging.WARNING)
+        self._diagnostics = diagnostics
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = record.getMessage()
+        if message.startswith('Executing') and ' took ' in message:
+            self._diagnostics.slow_callbacks.append(message)
+
+
+class Diagnostics:
+    """
+    Event-loop health and per-request timing diagnostics for `ClusterClient`.
+
+    Event-loop lag is measured by a background task that sleeps for `lag_interval` and records
+    how late it wakes up. Slow callbacks are collected from asyncio debug mode when
+    `slow_callback_duration` is set; debug mode has a noticeable cost, so it is off by default.
+    """
+
+    def __init__(self,
+                 lag_interval: float = 0.5,
+                 slow_callback_duration: Optional[float] = None,
+                 history: int = 100):
+        self.lag_interval = lag_interval
+        self.slow_callback_duration = slow_callback_duration
+        self.lag_samples: Deque[float] = deque(maxlen=history)
+        self.slow_callbacks: Deque[str] = deque(maxlen=history)
+        self.requests: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {'count': 0, 'failures': 0, 'queue_total': 0.0, 'queue_max': 0.0,
+                     'network_total': 0.0, 'network_max': 0.0}
+        )
+        self._lag_task: Optional[asyncio.Task] = None
+        self._slow_callback_handler: Optional[_SlowCallbackHandler] = None
+        self._loop_debug: Optional[Tuple[bool, float]] = None
+        self._signal: Optional[int] = None
+
+    def start(self) -> None:
+        """
+        Start monitoring the running event loop.
+        """
+
+        loop = asyncio.get_running_loop()
+        if self._lag_task is None:
+            self._lag_task = loop.create_task(self._monitor_lag())
+
+        if self.slow_callback_duration is not None and self._slow_callback_handler is None:
+            self._loop_debug = (loop.get_debug(), loop.slow_callback_duration)
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.slow_callback_duration
+            self._slow_callback_handler = _SlowCallbackHandler(self)
+            logging.getLogger('asyncio').addHandler(self._slow_callback_handler)
+
+    async def stop(self) -> None:
+        """
+        Stop monitoring the event loop and remove the signal handler, restoring the loop debug settings.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            try:
+                await self._lag_task
+            except asyncio.CancelledError:
+                pass
+            self._lag_task = None
+
+        if self._slow_callback_handler is not None:
+            logging.getLogger('asyncio').removeHandler(self._slow_callback_handler)
+            debug, slow_callback_duration = self._loop_debug
+            loop.set_debug(debug)
+            loop.slow_callback_duration = slow_callback_duration
+            self._slow_callback_handler = None
+            self._loop_debug = None
+
+        if self._signal is not None:
+            loop.remove_signal_handler(self._signal)
+            self._signal = None
+
+    async def _monitor_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.lag_samples.append(max(0.0, loop.time() - expected))
+
+    def trace(self, host: str) -> RequestTrace:
+        """
+        Create a trace extension for a single request.
+
+        :param host: The host URL the request is sent to.
+        :return: A `RequestTrace` to pass as the `trace` request extension.
+        """
+
+        return RequestTrace(self, host)
+
+    def record_request(self, host: str, queue_time: float, network_time: float, failed: bool = False) -> None:
+        """
+        Record the queue and network time of a completed or failed request.
+
+        :param host: The host URL the request was sent to.
+        :param queue_time: Seconds spent waiting for a pool connection.
+        :param network_time: Seconds spent connecting, sending and receiving.
+        :param failed: Whether the request raised instead of returning a response.
+        """
+
+        stats = self.requests[host]
+        stats['count'] += 1
+        if failed:
+            stats['failures'] += 1
+        stats['queue_total'] += queue_time
+        stats['queue_max'] = max(stats['queue_max'], queue_time)
+        stats['network_total'] += network_time
+        stats['network_max'] = max(stats['network_max'], network_time)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the collected diagnostics.
+
+        :return: A dictionary with event-loop lag, slow callbacks and per-host request timings.
+        """
+
+        lag = list(self.lag_samples)
+        return {
+            'loop_lag': {
+                'samples': len(lag),
+                'last': lag[-1] if lag else None,
+                'max': max(lag) if lag else None,
+                'mean': sum(lag) / len(lag) if lag else None,
+            },
+            'slow_callbacks': list(self.slow_callbacks),
+            'requests': {host: dict(stats) for host, stats in self.requests.items()},
+        }
+
+    async def profile(self, duration: float, limit: int = 20) -> str:
+        """
+        Profile the event loop with cProfile for a sampling window.
+
+        :param duration: Seconds to keep the profiler enabled.
+        :param limit: Number of functions to include in the report.
+        :return: The profile report sorted by cumulative time.
+        """
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profiler.disable()
+
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+
+    async def memory_snapshot(self, duration: float, limit: int = 10) -> List[str]:
+        """
+        Trace memory allocations with tracemalloc for a sampling window.
+
+        Tracing is stopped afterwards unless it was already running before the call.
+
+        :param duration: Seconds to keep tracing allocations.
+        :param limit: Number of allocation sites to return.
+        :return: The top allocation sites of the window grouped by line.
+        """
+
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+
+        try:
+            await asyncio.sleep(duration)
+            stats = tracemalloc.take_snapshot().statistics('lineno')
+        finally:
+            if started:
+                tracemalloc.stop()
+
+        return [str(stat) for stat in stats[:limit]]
+
+    def install_signal_handler(self, sig: int = signal.SIGUSR1) -> None:
+        """
+        Log the diagnostics snapshot whenever the process receives `sig`, until `stop()` is called.
+
+        :param sig: The signal number to handle.
+        """
+
+        asyncio.get_running_loop().add_signal_handler(sig, self._dump)
+        self._signal = sig
+
+    def _dump(self) -> None:
+        logger.info(f'Diagnostics: {self.snapshot()}')
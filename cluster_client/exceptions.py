@@ -16,3 +16,13 @@ class RequestErrorException(Exception):
     def __init__(self, host, message):
         self.message = f'Request error on {host}: {message}'
         super().__init__(self.message)
+
+
+class DeadlineExceededException(Exception):
+    """
+    Custom exception for operations that ran out of their overall time budget.
+    """
+
+    def __init__(self, host):
+        self.message = f'Operation deadline exceeded before request to {host}'
+        super().__init__(self.message)
@@ -0,0 +1,125 @@
+import time
+import httpx
+import inspect
+from collections import defaultdict, deque
+from typing import Deque, Dict, Optional
+from tenacity import RetryCallState
+from tenacity.stop import stop_base
+
+from .config import CONNECT_TIMEOUT, READ_TIMEOUT, WRITE_TIMEOUT, POOL_TIMEOUT
+from .exceptions import DeadlineExceededException
+
+
+class TimeoutPolicy:
+    """
+    Per-phase request timeouts, optionally adapted per host from observed latency.
+
+    Without adaptation every request gets the configured connect/read/write/pool timeouts.
+    With adaptation enabled, once a host has `min_samples` recorded latencies its connect,
+    read and write timeouts become `percentile latency * multiplier`, clamped to
+    `[floor, ceiling]`. The pool timeout is never adapted since it measures local contention.
+    All phases are additionally capped by the time left until the operation deadline.
+    """
+
+    def __init__(self,
+                 connect: float = CONNECT_TIMEOUT,
+                 read: float = READ_TIMEOUT,
+                 write: float = WRITE_TIMEOUT,
+                 pool: float = POOL_TIMEOUT,
+                 adaptive: bool = False,
+                 percentile: float = 0.99,
+                 multiplier: float = 2.0,
+                 floor: float = 0.2,
+                 ceiling: float = 10.0,
+                 window: int = 100,
+                 min_samples: int = 20):
+        if not 0 < percentile <= 1:
+            raise ValueError('percentile must be in (0, 1]')
+        if floor > ceiling:
+            raise ValueError('floor must not be greater than ceiling')
+
+        self.connect = connect
+        self.read = read
+        self.write = write
+        self.pool = pool
+        self.adaptive = adaptive
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.floor = floor
+        self.ceiling = ceiling
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, host: str, elapsed: float) -> None:
+        """
+        Record the latency of a request to a host.
+
+        For timed out requests the elapsed time is a lower bound of the real latency; recording it
+        lets the adapted timeout grow again when a host slows down.
+
+        :param host: The host URL the request was sent to.
+        :param elapsed: The request duration in seconds.
+        """
+
+        self._samples[host].append(elapsed)
+
+    def latency_percentile(self, host: str) -> Optional[float]:
+        """
+        Return the configured latency percentile for a host.
+
+        :param host: The host URL.
+        :return: The percentile in seconds, or `None` if fewer than `min_samples` were recorded.
+        """
+
+        samples = self._samples.get(host)
+        if not samples or len(samples) < self.min_samples:
+            return None
+
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return ordered[index]
+
+    def timeout_for(self, host: str, deadline: Optional[float] = None) -> httpx.Timeout:
+        """
+        Build the `httpx.Timeout` to use for the next request to a host.
+
+        :param host: The host URL.
+        :param deadline: Optional `time.monotonic()` timestamp by which the whole operation must finish.
+        :return: An `httpx.Timeout` with per-phase values.
+        :raises DeadlineExceededException: If the deadline has already passed.
+        """
+
+        connect, read, write, pool = self.connect, self.read, self.write, self.pool
+
+        if self.adaptive:
+            latency = self.latency_percentile(host)
+            if latency is not None:
+                bound = min(self.ceiling, max(self.floor, latency * self.multiplier))
+                connect = read = write = bound
+
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededException(host)
+            connect, read, write, pool = (min(value, remaining) for value in (connect, read, write, pool))
+
+        return httpx.Timeout(connect=connect, read=read, write=write, pool=pool)
+
+
+class stop_before_deadline(stop_base):
+    """
+    Stop retrying when the upcoming backoff would end after `deadline`, or after the call's
+    `deadline` argument when used as a decorator without one.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+
+    def __call__(self, retry_state: RetryCallState) -> bool:
+        deadline = self.deadline
+        if deadline is None and retry_state.fn is not None:
+            arguments = inspect.signature(retry_state.fn).bind(*retry_state.args, **retry_state.kwargs).arguments
+            deadline = arguments.get('deadline')
+        if deadline is None:
+            return False
+        return time.monotonic() + retry_state.upcoming_sleep >= deadline
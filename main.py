@@ -1,24 +1,39 @@
 import asyncio
 import logging
 from cluster_client.client import ClusterClient
+from cluster_client.config import DIAGNOSTICS
+from cluster_client.diagnostics import Diagnostics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 async def main():
-    client = ClusterClient()
+    diagnostics = None
+    if DIAGNOSTICS:
+        # Send SIGUSR1 to the process to log a diagnostics snapshot
+        diagnostics = Diagnostics()
+        diagnostics.start()
+        diagnostics.install_signal_handler()
+
+    client = ClusterClient(diagnostics=diagnostics)
     group_id = 'example_group'
 
-    # Create group
-    if await client.create_group(group_id):
-        logger.info('Group created successfully on all nodes.')
-    else:
-        logger.info('Group creation failed.')
+    try:
+        # Create group
+        if await client.create_group(group_id):
+            logger.info('Group created successfully on all nodes.')
+        else:
+            logger.info('Group creation failed.')
+
+        # Delete group
+        await client.delete_group(group_id)
+        logger.info('Group deleted from all nodes.')
 
-    # Delete group
-    await client.delete_group(group_id)
-    logger.info('Group deleted from all nodes.')
+    finally:
+        if diagnostics is not None:
+            logger.info(f'Diagnostics: {diagnostics.snapshot()}')
+            await diagnostics.stop()
 
 
 if __name__ == '__main__':
@@ -2,8 +2,8 @@ import pytest
 import httpx
 import tenacity
 from unittest import mock
-from cluster_client.client import ClusterClient
-from httpx import Response, RequestError, TimeoutException
+from cluster_client.client import ClusterClient, HostResult, IDEMPOTENCY_KEY_HEADER
+from httpx import ConnectError, ReadTimeout, Response, RequestError, TimeoutException
 
 from cluster_client.config import HOSTS
 
@@ -22,7 +22,7 @@ async def test_create_group_on_host_success():
 
     with mock.patch.object(httpx.AsyncClient, 'post', return_value=mock_response):
         result = await client._create_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group')
-        assert result is True
+        assert result is HostResult.SUCCEEDED
 
 
 @pytest.mark.asyncio
@@ -34,7 +34,7 @@ async def test_create_group_on_host_400_status_code():
 
     with mock.patch.object(httpx.AsyncClient, 'post', return_value=mock_response):
         result = await client._create_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group')
-        assert result is False
+        assert result is HostResult.FAILED
 
 
 @pytest.mark.asyncio
@@ -46,7 +46,7 @@ async def test_create_group_on_host_500_status_code():
 
     with mock.patch.object(httpx.AsyncClient, 'post', return_value=mock_response):
         result = await client._create_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group')
-        assert result is False
+        assert result is HostResult.FAILED
 
 
 @pytest.mark.asyncio
@@ -76,7 +76,7 @@ async def test_delete_group_on_host_success():
 
     with mock.patch.object(httpx.AsyncClient, 'request', return_value=mock_response):
         result = await client._delete_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group')
-        assert result is True
+        assert result is HostResult.SUCCEEDED
 
 
 @pytest.mark.asyncio
@@ -88,7 +88,7 @@ async def test_delete_group_on_host_400_status_code():
 
     with mock.patch.object(httpx.AsyncClient, 'request', return_value=mock_response):
         result = await client._delete_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group')
-        assert result is False
+        assert result is HostResult.FAILED
 
 
 @pytest.mark.asyncio
@@ -100,7 +100,7 @@ async def test_delete_group_on_host_500_status_code():
 
     with mock.patch.object(httpx.AsyncClient, 'request', return_value=mock_response):
         result = await client._delete_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group')
-        assert result is False
+        assert result is HostResult.FAILED
 
 
 @pytest.mark.asyncio
@@ -222,7 +222,7 @@ async def test_create_group_on_host_empty_group_id():
 
     with mock.patch.object(httpx.AsyncClient, 'post', return_value=mock_response):
         result = await client._create_group_on_host(httpx.AsyncClient(), HOSTS[0], '')
-        assert result is False
+        assert result is HostResult.FAILED
 
 
 @pytest.mark.asyncio
@@ -312,3 +312,130 @@ async def test_create_group_success_but_verification_fails(caplog):
         assert not success
 
     assert "Error during group creation. Detail:" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_create_group_on_host_already_exists():
+    client = ClusterClient()
+
+    mock_response = mock.Mock(spec=Response)
+    mock_response.status_code = 409
+    mock_response.headers = {}
+
+    with mock.patch.object(httpx.AsyncClient, 'post', return_value=mock_response):
+        result = await client._create_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group',
+                                                    idempotency_key='test_key')
+        assert result is HostResult.FAILED
+
+
+@pytest.mark.asyncio
+async def test_create_group_on_host_already_exists_acknowledged():
+    client = ClusterClient()
+
+    mock_response = mock.Mock(spec=Response)
+    mock_response.status_code = 409
+    mock_response.headers = {IDEMPOTENCY_KEY_HEADER: 'test_key'}
+
+    with mock.patch.object(httpx.AsyncClient, 'post', return_value=mock_response):
+        result = await client._create_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group',
+                                                    idempotency_key='test_key')
+        assert result is HostResult.ACKNOWLEDGED
+
+
+@pytest.mark.asyncio
+async def test_delete_group_on_host_already_absent():
+    client = ClusterClient()
+
+    mock_response = mock.Mock(spec=Response)
+    mock_response.status_code = 404
+
+    with mock.patch.object(httpx.AsyncClient, 'request', return_value=mock_response):
+        result = await client._delete_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group')
+        assert result is HostResult.SUCCEEDED
+
+
+@pytest.mark.asyncio
+async def test_create_group_on_host_idempotency_key_stable_across_retries():
+    client = ClusterClient()
+
+    mock_response = mock.Mock(spec=Response)
+    mock_response.status_code = 409
+    mock_response.headers = {}
+
+    with mock.patch.object(httpx.AsyncClient, 'post', side_effect=[ReadTimeout('Read timed out'), mock_response]) \
+            as mock_post:
+        result = await client._create_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group',
+                                                    idempotency_key='test_key')
+        assert result is HostResult.DUPLICATE
+
+    headers = [call.kwargs['headers'] for call in mock_post.call_args_list]
+    assert headers == [{IDEMPOTENCY_KEY_HEADER: 'test_key'}] * 2
+
+
+@pytest.mark.asyncio
+async def test_create_group_skips_verification_after_idempotent_ack():
+    client = ClusterClient(hosts=HOSTS)
+
+    async def mock_post(self, url, json=None, timeout=None, headers=None, extensions=None):
+        return Response(201, headers=headers)
+
+    with mock.patch('httpx.AsyncClient.post', new=mock_post), \
+            mock.patch.object(client, '_verify_group_on_host', return_value=False) as mock_verify:
+        result = await client.create_group('test_group')
+        assert result is True
+        assert mock_verify.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_create_group_does_not_rollback_existing_group():
+    hosts = ["http://node1.example.com", "http://node2.example.com"]
+
+    client = ClusterClient(hosts=hosts)
+
+    async def mock_post(self, url, json=None, timeout=None, headers=None, extensions=None):
+        if "node1.example.com" in url:
+            return Response(409)
+        return Response(500)
+
+    with mock.patch('httpx.AsyncClient.post', new=mock_post), \
+            mock.patch('httpx.AsyncClient.request') as mock_request:
+        result = await client.create_group('test_group')
+        assert result is False
+        assert mock_request.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_create_group_on_host_conflict_after_connect_error():
+    client = ClusterClient()
+
+    mock_response = mock.Mock(spec=Response)
+    mock_response.status_code = 409
+    mock_response.headers = {}
+
+    with mock.patch.object(httpx.AsyncClient, 'post', side_effect=[ConnectError('Connection refused'), mock_response]):
+        result = await client._create_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group',
+                                                    idempotency_key='test_key')
+        assert result is HostResult.FAILED
+
+
+@pytest.mark.parametrize('first_error', [ConnectError('Connection refused'), ReadTimeout('Read timed out')])
+@pytest.mark.asyncio
+async def test_create_group_does_not_rollback_existing_group_after_retry(first_error):
+    hosts = ["http://node1.example.com", "http://node2.example.com"]
+
+    client = ClusterClient(hosts=hosts)
+    node1_responses = [first_error, Response(409)]
+
+    async def mock_post(self, url, json=None, timeout=None, headers=None, extensions=None):
+        if "node1.example.com" in url:
+            response = node1_responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        return Response(500)
+
+    with mock.patch('httpx.AsyncClient.post', new=mock_post), \
+            mock.patch('httpx.AsyncClient.request') as mock_request:
+        result = await client.create_group('test_group')
+        assert result is False
+        assert mock_request.call_count == 0
@@ -5,7 +5,7 @@ import tenacity
 from unittest import mock
 from httpx import Response, RequestError
 
-from cluster_client.client import ClusterClient
+from cluster_client.client import ClusterClient, HostResult
 from cluster_client.config import HOSTS
 from cluster_client.exceptions import RequestErrorException
 
@@ -24,7 +24,7 @@ async def test_create_group_concurrent_requests_success():
         tasks = [create_group() for _ in range(5)]
         results = await asyncio.gather(*tasks)
 
-        assert all(result is True for result in results)
+        assert all(result is HostResult.SUCCEEDED for result in results)
         assert mock_post.call_count == 5
 
 
@@ -42,7 +42,7 @@ async def test_create_group_concurrent_requests_failure():
         tasks = [create_group() for _ in range(5)]
         results = await asyncio.gather(*tasks)
 
-        assert all(result is False for result in results)
+        assert all(result is HostResult.FAILED for result in results)
         assert mock_post.call_count == 5
 
 
@@ -80,7 +80,7 @@ async def test_delete_group_concurrent_requests_success():
         tasks = [delete_group() for _ in range(5)]
         results = await asyncio.gather(*tasks)
 
-        assert all(result is True for result in results)
+        assert all(result is HostResult.SUCCEEDED for result in results)
         assert mock_request.call_count == 5
 
 
@@ -98,7 +98,7 @@ async def test_delete_group_concurrent_requests_failure():
         tasks = [delete_group() for _ in range(5)]
         results = await asyncio.gather(*tasks)
 
-        assert all(result is False for result in results)
+        assert all(result is HostResult.FAILED for result in results)
         assert mock_request.call_count == 5
 
 
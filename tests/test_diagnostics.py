@@ -0,0 +1,139 @@
+import os
+import time
+import signal
+import tracemalloc
+import pytest
+import asyncio
+import logging
+import httpx
+from unittest import mock
+from httpx import Response, TimeoutException
+
+from cluster_client.client import ClusterClient
+from cluster_client.config import HOSTS
+from cluster_client.diagnostics import Diagnostics
+
+
+@pytest.mark.asyncio
+async def test_request_trace_splits_queue_and_network_time():
+    diagnostics = Diagnostics()
+
+    trace = diagnostics.trace(HOSTS[0])
+    await asyncio.sleep(0.01)
+    await trace('connection.connect_tcp.started', {})
+    trace.finish()
+
+    stats = diagnostics.snapshot()['requests'][HOSTS[0]]
+    assert stats['count'] == 1
+    assert stats['queue_total'] >= 0.01
+    assert stats['network_total'] < stats['queue_total']
+
+
+@pytest.mark.asyncio
+async def test_create_group_on_host_records_request():
+    client = ClusterClient(diagnostics=Diagnostics())
+
+    mock_response = mock.Mock(spec=Response)
+    mock_response.status_code = 201
+
+    with mock.patch.object(httpx.AsyncClient, 'post', return_value=mock_response) as mock_post:
+        await client._create_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group')
+        assert 'trace' in mock_post.call_args.kwargs['extensions']
+
+    assert client.diagnostics.snapshot()['requests'][HOSTS[0]]['count'] == 1
+
+
+@pytest.mark.asyncio
+async def test_send_records_failed_request():
+    client = ClusterClient(diagnostics=Diagnostics())
+
+    with mock.patch.object(httpx.AsyncClient, 'post', side_effect=TimeoutException('Request timed out')):
+        with pytest.raises(TimeoutException):
+            await client._send(httpx.AsyncClient().post, HOSTS[0], None, url=HOSTS[0])
+
+    stats = client.diagnostics.snapshot()['requests'][HOSTS[0]]
+    assert stats['count'] == 1
+    assert stats['failures'] == 1
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_measured():
+    diagnostics = Diagnostics(lag_interval=0.01)
+
+    diagnostics.start()
+    await asyncio.sleep(0.05)
+    await diagnostics.stop()
+
+    lag = diagnostics.snapshot()['loop_lag']
+    assert lag['samples'] > 0
+    assert lag['max'] >= 0
+
+
+@pytest.mark.asyncio
+async def test_slow_callbacks_collected():
+    diagnostics = Diagnostics(slow_callback_duration=0.01)
+
+    diagnostics.start()
+    asyncio.get_running_loop().call_soon(time.sleep, 0.02)
+    await asyncio.sleep(0.01)
+    await diagnostics.stop()
+
+    assert len(diagnostics.snapshot()['slow_callbacks']) == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_restores_loop_debug_settings():
+    loop = asyncio.get_running_loop()
+    loop.set_debug(True)
+    loop.slow_callback_duration = 0.5
+    diagnostics = Diagnostics(slow_callback_duration=0.01)
+
+    try:
+        diagnostics.start()
+        await diagnostics.stop()
+
+        assert loop.get_debug() is True
+        assert loop.slow_callback_duration == 0.5
+    finally:
+        loop.set_debug(False)
+
+
+@pytest.mark.asyncio
+async def test_profile():
+    diagnostics = Diagnostics()
+
+    report = await diagnostics.profile(0.01, limit=5)
+    assert 'function calls' in report
+
+
+@pytest.mark.asyncio
+async def test_memory_snapshot_samples_window():
+    diagnostics = Diagnostics()
+    allocated = []
+
+    async def allocate():
+        await asyncio.sleep(0)
+        allocated.append([bytearray(1024) for _ in range(1000)])
+
+    task = asyncio.create_task(allocate())
+    sites = await diagnostics.memory_snapshot(0.01, limit=5)
+    await task
+
+    assert any('test_diagnostics.py' in site for site in sites)
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.asyncio
+async def test_signal_dumps_snapshot(caplog):
+    diagnostics = Diagnostics()
+
+    with caplog.at_level(logging.INFO):
+        diagnostics.install_signal_handler(signal.SIGUSR1)
+        try:
+            os.kill(os.getpid(), signal.SIGUSR1)
+            await asyncio.sleep(0.01)
+        finally:
+            await diagnostics.stop()
+
+    assert 'Diagnostics:' in caplog.text
+    assert asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR1) is False
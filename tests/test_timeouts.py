@@ -0,0 +1,152 @@
+import time
+import pytest
+import asyncio
+import httpx
+import tenacity
+from unittest import mock
+from httpx import Response, PoolTimeout, RequestError, TimeoutException
+
+from cluster_client.client import ClusterClient
+from cluster_client.config import HOSTS
+from cluster_client.exceptions import DeadlineExceededException
+from cluster_client.timeouts import TimeoutPolicy
+
+
+def test_timeout_for_static_phases():
+    policy = TimeoutPolicy(connect=1, read=2, write=3, pool=4)
+
+    timeout = policy.timeout_for(HOSTS[0])
+    assert timeout == httpx.Timeout(connect=1, read=2, write=3, pool=4)
+
+
+def test_timeout_for_not_adapted_before_min_samples():
+    policy = TimeoutPolicy(connect=1, read=2, write=3, pool=4, adaptive=True, min_samples=5)
+
+    for _ in range(4):
+        policy.record(HOSTS[0], 0.01)
+
+    assert policy.timeout_for(HOSTS[0]) == httpx.Timeout(connect=1, read=2, write=3, pool=4)
+
+
+def test_timeout_for_adapts_to_host_latency():
+    policy = TimeoutPolicy(pool=4, adaptive=True, multiplier=2, floor=0.01, ceiling=10, min_samples=5)
+
+    for _ in range(5):
+        policy.record(HOSTS[0], 0.1)
+
+    timeout = policy.timeout_for(HOSTS[0])
+    assert timeout == httpx.Timeout(connect=0.2, read=0.2, write=0.2, pool=4)
+    assert policy.latency_percentile(HOSTS[1]) is None
+
+
+def test_timeout_for_clamped_to_floor_and_ceiling():
+    policy = TimeoutPolicy(adaptive=True, floor=0.5, ceiling=3, min_samples=1)
+
+    policy.record(HOSTS[0], 0.001)
+    policy.record(HOSTS[1], 60)
+
+    assert policy.timeout_for(HOSTS[0]).read == 0.5
+    assert policy.timeout_for(HOSTS[1]).read == 3
+
+
+def test_timeout_for_bounded_by_deadline():
+    policy = TimeoutPolicy(connect=10, read=10, write=10, pool=10)
+
+    timeout = policy.timeout_for(HOSTS[0], deadline=time.monotonic() + 1)
+    assert all(value <= 1 for value in (timeout.connect, timeout.read, timeout.write, timeout.pool))
+
+
+def test_timeout_for_deadline_exceeded():
+    policy = TimeoutPolicy()
+
+    with pytest.raises(DeadlineExceededException):
+        policy.timeout_for(HOSTS[0], deadline=time.monotonic() - 1)
+
+
+@pytest.mark.asyncio
+async def test_create_group_on_host_records_latency():
+    client = ClusterClient(timeout_policy=TimeoutPolicy(adaptive=True, min_samples=1))
+
+    mock_response = mock.Mock(spec=Response)
+    mock_response.status_code = 201
+
+    with mock.patch.object(httpx.AsyncClient, 'post', return_value=mock_response) as mock_post:
+        await client._create_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group')
+        assert isinstance(mock_post.call_args.kwargs['timeout'], httpx.Timeout)
+
+    assert client.timeout_policy.latency_percentile(HOSTS[0]) is not None
+
+
+@pytest.mark.asyncio
+async def test_create_group_on_host_deadline_exceeded_not_retried():
+    client = ClusterClient()
+
+    with mock.patch.object(httpx.AsyncClient, 'post') as mock_post:
+        with pytest.raises(DeadlineExceededException):
+            await client._create_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group', time.monotonic() - 1)
+        assert mock_post.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_delete_group_operation_timeout_exceeded():
+    client = ClusterClient(hosts=HOSTS, operation_timeout=0)
+
+    with mock.patch.object(httpx.AsyncClient, 'request') as mock_request:
+        result = await client.delete_group('test_group')
+        assert result == HOSTS
+        assert mock_request.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_timed_out_requests_grow_adapted_timeout():
+    client = ClusterClient(timeout_policy=TimeoutPolicy(adaptive=True, floor=0.01, ceiling=10, min_samples=1))
+
+    for _ in range(100):
+        client.timeout_policy.record(HOSTS[0], 0.005)
+    assert client.timeout_policy.timeout_for(HOSTS[0]).read == 0.01
+
+    async def slow_post(url, json=None, timeout=None, extensions=None):
+        await extensions['trace']('connection.connect_tcp.started', {})
+        await asyncio.sleep(timeout.read)
+        raise TimeoutException('Request timed out')
+
+    for _ in range(3):
+        with pytest.raises(TimeoutException):
+            await client._send(slow_post, HOSTS[0], None, url=HOSTS[0])
+
+    assert client.timeout_policy.timeout_for(HOSTS[0]).read >= 0.08
+
+
+@pytest.mark.asyncio
+async def test_create_group_on_host_stops_retrying_before_deadline():
+    client = ClusterClient()
+
+    with mock.patch.object(httpx.AsyncClient, 'post', side_effect=RequestError('Request failed')) as mock_post:
+        started = time.monotonic()
+        with pytest.raises(tenacity.RetryError):
+            await client._create_group_on_host(httpx.AsyncClient(), HOSTS[0], 'test_group', time.monotonic() + 0.5)
+        assert time.monotonic() - started < 0.5
+        assert mock_post.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_wait_not_recorded_as_host_latency():
+    client = ClusterClient(timeout_policy=TimeoutPolicy(adaptive=True, min_samples=1))
+
+    for _ in range(100):
+        client.timeout_policy.record(HOSTS[0], 0.005)
+
+    async def queued_post(url, timeout=None, extensions=None):
+        await asyncio.sleep(0.1)
+        await extensions['trace']('http11.send_request_headers.started', {})
+        return Response(201)
+
+    async def pool_timeout_post(url, timeout=None, extensions=None):
+        await asyncio.sleep(0.1)
+        raise PoolTimeout('Pool timed out')
+
+    await client._send(queued_post, HOSTS[0], None, url=HOSTS[0])
+    with pytest.raises(PoolTimeout):
+        await client._send(pool_timeout_post, HOSTS[0], None, url=HOSTS[0])
+
+    assert client.timeout_policy.latency_percentile(HOSTS[0]) == 0.005